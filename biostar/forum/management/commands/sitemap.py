@@ -2,18 +2,18 @@
 Creates a sitemap in the EXPORT directory
 """
 import os
+import sys
 from django.conf import settings
-from django.contrib.sitemaps import GenericSitemap
-from django.contrib.sites.models import Site
 from biostar.forum.models import Post
-from django.utils.encoding import smart_str
-from django.template import loader
 from django.core.management.base import BaseCommand, CommandError
 import logging
 from django.contrib import sitemaps
 
 logger = logging.getLogger("engine")
 
+# Rows fetched from the database at a time.
+CHUNK_SIZE = 5000
+
 URLSET_START = """<?xml version="1.0" encoding="UTF-8"?>
 <urlset xmlns="https://www.sitemaps.org/schemas/sitemap/0.9">
 """
@@ -29,9 +29,11 @@ URLSET_ROW = """
     </url>
 """
 
-SITEMAP_XML = """<?xml version="1.0" encoding="UTF-8"?>
+SITEMAP_START = """<?xml version="1.0" encoding="UTF-8"?>
 <sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-%s
+"""
+
+SITEMAP_END = """
 </sitemapindex>
 """
 
@@ -52,33 +54,42 @@ def ping_google():
         pass
 
 
-def generate_sitemap(index, batch):
-    site = Site.objects.get_current()
+def generate_sitemap(index, batch, stream=None):
+    """
+    Writes the sitemap index or a batch of urls into the stream, row by row.
+    """
+    stream = stream or sys.stdout
+
+    # The site domain is set from the settings on migrate.
+    domain = settings.SITE_DOMAIN
 
     # Generates the sitemap index.
     if index:
-        body = []
+        stream.write(SITEMAP_START)
         for step in range(index):
-            body.append(SITEMAP_ROW % (site.domain, step+1))
-        text = "".join(body)
-        print(SITEMAP_XML % text)
+            stream.write(SITEMAP_ROW % (domain, step+1))
+        stream.write(SITEMAP_END)
 
         return
 
     if batch:
         N = 50000
-        # Defers all fields beyond uid!
         start = (batch-1) * N
         end = batch * N
+        # Fetch plain tuples, no model instances or related lookups per row.
         posts = Post.objects.filter(is_toplevel=True, root__status=Post.OPEN) \
-            .exclude(type=Post.BLOG).order_by("-pk").only("uid", "lastedit_date")[start:end]
+            .exclude(type=Post.BLOG).order_by("-pk").values_list("uid", "lastedit_date")[start:end]
+
+        # Fill in the domain once, the rows only add the uid and the date.
+        row_format = URLSET_ROW % (domain.replace("%", "%%"), "%s", "%s")
 
-        print(URLSET_START, end='')
-        for post in posts:
-            lastmod = post.lastedit_date.strftime("%Y-%m-%d")
-            row = URLSET_ROW % (site.domain, post.uid, lastmod)
-            print(row, end='')
-        print(URLSET_END, end='')
+        stream.write(URLSET_START)
+        # Iterate in chunks, a server side cursor on PostgreSQL.
+        for uid, lastedit_date in posts.iterator(chunk_size=CHUNK_SIZE):
+            # Same as strftime("%Y-%m-%d") but faster.
+            lastmod = lastedit_date.date().isoformat()
+            stream.write(row_format % (uid, lastmod))
+        stream.write(URLSET_END)
 
 
 class Command(BaseCommand):
@@ -87,9 +98,29 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--index', default=0, help="Writes an index")
         parser.add_argument('--batch', default=0, help="50K URL in a batch")
+        parser.add_argument('--fname', default='', help="Output file, prints to stdout by default")
 
     def handle(self, *args, **options):
         index = int(options['index'])
         batch = int(options['batch'])
-        generate_sitemap(index=index, batch=batch)
+        fname = options['fname']
+
+        if not fname:
+            generate_sitemap(index=index, batch=batch)
+            return
+
+        # An empty file would replace the sitemap being served.
+        if not (index or batch):
+            raise CommandError("Output file requires an --index or a --batch")
+
+        # Write into a temporary file then swap it in place,
+        # the sitemap being served is never partially written.
+        tmpname = f"{fname}.tmp"
+        try:
+            with open(tmpname, 'wt', encoding='utf-8', buffering=1 << 20) as fp:
+                generate_sitemap(index=index, batch=batch, stream=fp)
+        except Exception:
+            os.remove(tmpname)
+            raise
+        os.replace(tmpname, fname)
         # ping_google()
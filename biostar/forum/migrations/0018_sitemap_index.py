@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-14 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0017_expanded_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(is_toplevel=True), fields=['-id'], name='post_sitemap_idx'),
+        ),
+    ]
@@ -198,6 +198,12 @@ class Post(models.Model):
 
     objects = PostManager()
 
+    class Meta:
+        indexes = [
+            # Top level posts in the order the sitemap lists them.
+            models.Index(fields=['-id'], name='post_sitemap_idx', condition=Q(is_toplevel=True)),
+        ]
+
     def parse_tags(self):
         return [tag.lower() for tag in self.tag_val.split(",") if tag]
 
@@ -0,0 +1,75 @@
+import io
+import logging
+import os
+import tempfile
+from django.core import management
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.conf import settings
+from biostar.forum import models
+from biostar.forum.management.commands.sitemap import generate_sitemap
+from biostar.accounts.models import User
+
+logger = logging.getLogger('engine')
+
+
+class SitemapTest(TestCase):
+
+    def setUp(self):
+        logger.setLevel(logging.WARNING)
+        self.owner = User.objects.create(username=f"test", email="tested@tested.com", password="tested")
+
+        self.posts = [models.Post.objects.create(title=f"Test {step}", author=self.owner, content="Test",
+                                                 type=models.Post.QUESTION) for step in range(3)]
+        self.blog = models.Post.objects.create(title="Blog", author=self.owner, content="Test",
+                                               type=models.Post.BLOG)
+
+    def test_sitemap_index(self):
+        "Test the sitemap index lists every batch"
+
+        stream = io.StringIO()
+        generate_sitemap(index=2, batch=0, stream=stream)
+        text = stream.getvalue()
+
+        self.assertIn("<sitemapindex", text)
+        for step in (1, 2):
+            self.assertIn(f"https://{settings.SITE_DOMAIN}/static/sitemap_{step}.xml", text)
+
+    def test_sitemap_batch(self):
+        "Test the sitemap batch lists the open top level posts"
+
+        stream = io.StringIO()
+        generate_sitemap(index=0, batch=1, stream=stream)
+        text = stream.getvalue()
+
+        self.assertIn("<urlset", text)
+        for post in self.posts:
+            post = models.Post.objects.get(id=post.id)
+            self.assertIn(f"<loc>https://{settings.SITE_DOMAIN}/p/{post.uid}/</loc>", text)
+            self.assertIn(f"<lastmod>{post.lastedit_date:%Y-%m-%d}</lastmod>", text)
+        self.assertNotIn(f"/p/{self.blog.uid}/", text, "Blog posts listed in the sitemap")
+
+        # Past the last batch there are no urls.
+        stream = io.StringIO()
+        generate_sitemap(index=0, batch=2, stream=stream)
+        self.assertNotIn("<url>", stream.getvalue())
+
+    def test_sitemap_file(self):
+        "Test the sitemap command writes the output file"
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, "sitemap.xml")
+
+            management.call_command('sitemap', batch=1, fname=fname)
+
+            with open(fname, encoding='utf-8') as fp:
+                text = fp.read()
+            self.assertIn(f"/p/{self.posts[0].uid}/", text)
+            self.assertFalse(os.path.exists(f"{fname}.tmp"), "Temporary file left behind")
+
+            # The sitemap is not replaced by an empty file.
+            with self.assertRaises(CommandError):
+                management.call_command('sitemap', fname=fname)
+
+            with open(fname, encoding='utf-8') as fp:
+                self.assertEqual(fp.read(), text, "Sitemap changed without an index or a batch")
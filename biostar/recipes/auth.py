@@ -53,7 +53,7 @@ def access_denied_message(user, needed_access):
     tmpl = loader.get_template('widgets/access_denied_message.html')
 
     # Get the string format of the access.
-    needed_access = dict(Access.ACCESS_CHOICES).get(needed_access)
+    needed_access = Access.ACCESS_MAP.get(needed_access)
 
     context = dict(user=user, needed_access=needed_access)
     return tmpl.render(context=context)
@@ -183,7 +183,7 @@ def generate_script(job):
     Generates a script from a job.
     """
     work_dir = job.path
-    json_data = hjson.loads(job.json_text)
+    json_data = util.load_json_text(job.json_text)
 
     # The base url to the site.
     url_base = f'{settings.PROTOCOL}://{settings.SITE_DOMAIN}{settings.HTTP_PORT}'
@@ -632,18 +632,13 @@ def move(uids, project, user, otype="data"):
 
     items = [klass.objects.filter(uid=uid).first() for uid in uids]
     for item in items:
-        # Get previous project to reset counts after swapping.
-        previous = item.project
-
         # Check for write access before moving object from project.
-        if not is_writable(user=user, project=previous):
+        if not is_writable(user=user, project=item.project):
             continue
 
         item.project = project
-        # Swap projects
+        # Swap projects, the counts of both projects follow the item.
         item.save()
-        # Reset counts for the previous project.
-        previous.set_counts()
 
 
 def paste(project, user, board, clone=False):
@@ -782,7 +777,7 @@ def create_job(analysis, user=None, json_text='', json_data={}, name=None, state
     # Generate a meaningful job title.
     name = make_job_title(recipe=analysis, data=json_data)
     # Update the json_text and name
-    job.json_text = hjson.dumps(json_data)
+    job.json_text = util.dump_json_text(json_data)
     job.name = name
 
     # Append parameter summary to job on creation.
@@ -792,7 +787,6 @@ def create_job(analysis, user=None, json_text='', json_data={}, name=None, state
     if save:
         # Save the updated json_text and name.
         job.save()
-        # Update the projects lastedit user when a job is created
         logger.info(f"Created job id={job.id} name={job.name}")
 
     return job
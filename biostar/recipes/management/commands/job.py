@@ -8,7 +8,7 @@ from django.template import Template, Context
 from django.utils.encoding import force_text
 
 from biostar.recipes.models import Job
-from biostar.recipes import auth
+from biostar.recipes import auth, util
 from django.conf import settings
 from django.utils import timezone
 from biostar.emailer.tasks import send_email
@@ -98,7 +98,7 @@ def run(job, options={}):
 
     try:
         # Find the json and the template.
-        json_data = hjson.loads(job.json_text)
+        json_data = util.load_json_text(job.json_text)
         template = job.template
 
         # This is the work directory.
@@ -0,0 +1,25 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from biostar.recipes.models import Project
+
+logger = logging.getLogger('engine')
+
+
+class Command(BaseCommand):
+    help = 'Recounts the data, recipes and results of projects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uid', default='', help="Recount a single project, all projects by default")
+
+    def handle(self, *args, **options):
+        uid = options['uid']
+
+        projects = Project.objects.filter(uid=uid) if uid else Project.objects.all()
+
+        count = 0
+        for project in projects.iterator():
+            project.set_counts()
+            count += 1
+
+        logger.info(f"Recounted {count} projects")
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-14 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_rank'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysis',
+            index=models.Index(fields=['root', 'project'], name='recipes_ana_root_id_e38233_idx'),
+        ),
+    ]
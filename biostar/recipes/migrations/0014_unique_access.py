@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-14 04:39
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keeps the first access of each user, project and access level.
+    """
+
+    Access = apps.get_model('recipes', 'Access')
+
+    seen = set()
+    duplicates = []
+    for pk, user_id, project_id, access in Access.objects.order_by('pk').values_list('pk', 'user_id',
+                                                                                     'project_id', 'access'):
+        key = (user_id, project_id, access)
+        if key in seen:
+            duplicates.append(pk)
+        seen.add(key)
+
+    Access.objects.filter(pk__in=duplicates).delete()
+
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_clone_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='access',
+            constraint=models.UniqueConstraint(fields=('user', 'project', 'access'), name='unique_access'),
+        ),
+    ]
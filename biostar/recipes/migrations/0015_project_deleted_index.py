@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-14 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_unique_access'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysis',
+            index=models.Index(fields=['project', 'deleted'], name='recipes_ana_project_2de2f0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='data',
+            index=models.Index(fields=['project', 'deleted'], name='recipes_dat_project_c40dc1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['project', 'deleted'], name='recipes_job_project_80f4d1_idx'),
+        ),
+    ]
@@ -1,16 +1,19 @@
 import logging
+import hashlib
+import copy
+import threading
 
 import toml as hjson
 import mistune
 import urllib.parse
 import base64
 from django.db import models
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 from django.template import loader
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.conf import settings
+from django.core.cache import cache
 from biostar.accounts.models import User
 from . import util
 from .const import *
@@ -27,14 +30,52 @@ class Bunch(object):
         self.__dict__.update(kwargs)
 
 
+# Time to live in seconds for the rendered markdown.
+HTML_CACHE_TTL = 3600 * 24
+
+# Markdown parsers keep state while parsing, each thread reuses its own.
+MARKDOWN_PARSERS = threading.local()
+
+
+def render_markdown(text, escape=True):
+    """
+    Renders the markdown with the parser of the current thread.
+    """
+    parsers = MARKDOWN_PARSERS.__dict__.setdefault("parsers", {})
+    if escape not in parsers:
+        parsers[escape] = mistune.Markdown(escape=escape)
+
+    try:
+        return parsers[escape](text)
+    except Exception:
+        # A failed parse leaves its link definitions behind, build a new parser next time.
+        del parsers[escape]
+        raise
+
+
 def make_html(text, user=None):
-    if user and user.profile.trusted:
-        html = mistune.markdown(text, escape=False)
-    else:
-        html = mistune.markdown(text, escape=True)
+    # Escaping only applies to raw html, skip the profile lookup when there is none.
+    trusted = "<" in text and bool(user and user.profile.trusted)
+
+    # The same text renders to the same html.
+    digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    key = f"MARKDOWN-{int(trusted)}-{digest}"
+
+    html = cache.get(key)
+    if html is None:
+        html = render_markdown(text, escape=not trusted)
+        cache.set(key, html, HTML_CACHE_TTL)
+
     return html
 
 
+def counted_project(instance):
+    """
+    Returns the id of the project whose counts include this instance.
+    """
+    return None if instance.deleted else instance.project_id
+
+
 def image_path(instance, filename):
     # Name the data by the filename.
     name, ext = os.path.splitext(filename)
@@ -123,6 +164,8 @@ class Project(models.Model):
     PUBLIC, SHAREABLE, PRIVATE = 1, 2, 3
     PRIVACY_CHOICES = [(PRIVATE, "Private"), (SHAREABLE, "Shared"), (PUBLIC, "Public")]
 
+    PRIVACY_MAP = dict(PRIVACY_CHOICES)
+
     # Rank in a project list.
     rank = models.FloatField(default=100)
 
@@ -156,6 +199,10 @@ class Project(models.Model):
 
     objects = Manager()
 
+    # Counts kept in the database by the signals and by set_counts(),
+    # save() does not write them for existing rows.
+    COUNT_FIELDS = ("data_count", "recipes_count", "jobs_count")
+
     def save(self, *args, **kwargs):
         now = timezone.now()
         self.date = self.date or now
@@ -166,6 +213,13 @@ class Project(models.Model):
         self.lastedit_user = self.lastedit_user or self.owner
         self.lastedit_date = now
 
+        # Existing rows keep their database counts, the instance may hold stale values.
+        # Saving with update_fields raises a DatabaseError when the row no longer exists,
+        # instead of inserting it again. Callers passing update_fields choose the fields.
+        if not self._state.adding and not args and "update_fields" not in kwargs:
+            kwargs["update_fields"] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.COUNT_FIELDS]
+
         super(Project, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -193,11 +247,11 @@ class Project(models.Model):
         # Set the counts on current instance and also update in database.
         self.recipes_count = self.analysis_set.filter(project=self, deleted=False).count()
         self.data_count = self.data_set.filter(deleted=False).count()
-        self.job_count = self.job_set.filter(deleted=False).count()
+        self.jobs_count = self.job_set.filter(deleted=False).count()
 
         Project.objects.filter(id=self.id).update(data_count=self.data_count,
                                                   recipes_count=self.recipes_count,
-                                                  jobs_count=self.job_count)
+                                                  jobs_count=self.jobs_count)
 
     @property
     def is_public(self):
@@ -223,7 +277,7 @@ class Project(models.Model):
         json_data = dict(
             uid=self.uid,
             name=self.name,
-            privacy=dict(self.PRIVACY_CHOICES)[self.privacy],
+            privacy=self.PRIVACY_MAP[self.privacy],
             text=self.text,
             url=settings.BASE_URL,
             project_uid=self.uid,
@@ -231,12 +285,20 @@ class Project(models.Model):
             image=strimg,
             # Insert recipes API data in there as well.
             recipes=[
-                r.api_data for r in self.analysis_set.all()
+                r.api_data for r in self.api_recipes()
             ]
         )
 
         return json_data
 
+    def api_recipes(self):
+        """
+        Returns the recipes of the project with only what the api data needs.
+        """
+        recipes = self.analysis_set.select_related(None).select_related("root")
+        recipes = recipes.defer("html", "last_valid")
+        return recipes
+
     @property
     def summary(self):
         """
@@ -291,18 +353,15 @@ class Access(models.Model):
     def __str__(self):
         return f"{self.user} on {self.project.name}"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'project', 'access'], name='unique_access'),
+        ]
+
     def save(self, *args, **kwargs):
         super(Access, self).save(*args, **kwargs)
 
 
-@receiver(post_save, sender=Project)
-def update_access(sender, instance, created, raw, update_fields, **kwargs):
-    # Give the owner WRITE ACCESS if they do not have it.
-    entry = Access.objects.filter(user=instance.owner, project=instance, access=Access.WRITE_ACCESS)
-    if entry.first() is None:
-        entry = Access.objects.create(user=instance.owner, project=instance, access=Access.WRITE_ACCESS)
-
-
 class Data(models.Model):
     PENDING, READY, ERROR, = 1, 2, 3
     STATE_CHOICES = [(PENDING, "Pending"), (READY, "Ready"), (ERROR, "Error")]
@@ -349,8 +408,21 @@ class Data(models.Model):
 
     objects = Manager()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    # Project counts this instance is part of, kept up to date by the signals.
+    _counted = None
+
+    class Meta:
+        indexes = [
+            # Counts and lists the data of a project.
+            models.Index(fields=['project', 'deleted']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The project counts this row is part of in the database.
+        instance._counted = counted_project(instance)
+        return instance
 
     def save(self, *args, **kwargs):
         now = timezone.now()
@@ -365,16 +437,20 @@ class Data(models.Model):
 
         super(Data, self).save(*args, **kwargs)
 
-        # Set the counts
-        self.project.set_counts(save=True)
+    @cached_property
+    def _toc_lines(self):
+        """
+        Returns the lines of the toc file, read once per instance.
+        """
+        with open(self.get_path(), 'rt') as fp:
+            return tuple(fp.readlines())
 
     def peek(self):
         """
         Returns a preview of the data
         """
         try:
-            target = self.get_path()
-            lines = open(target, 'rt').readlines()
+            lines = self._toc_lines
             if len(lines) == 1:
                 target = lines[0]
                 return util.smart_preview(target)
@@ -387,9 +463,7 @@ class Data(models.Model):
 
     def table_of_contents(self):
         try:
-            target = self.get_path()
-            lines = open(target, 'rt').readlines()
-            lines = [os.path.relpath(path, self.get_data_dir()) for path in lines]
+            lines = [os.path.relpath(path, self.get_data_dir()) for path in self._toc_lines]
         except Exception as exc:
             return f"Error :{exc}"
 
@@ -416,7 +490,11 @@ class Data(models.Model):
 
         tocname = self.get_path()
 
-        collect = util.findfiles(self.get_data_dir(), collect=[])
+        # Collect the file paths and the cumulative size in one pass.
+        collect, size = [], 0
+        for path, fsize in util.findsizes(self.get_data_dir()):
+            collect.append(path)
+            size += fsize
 
         # Create a sorted file path collection.
         collect.sort()
@@ -424,11 +502,8 @@ class Data(models.Model):
         with open(tocname, 'w') as fp:
             fp.write("\n".join(collect))
 
-        # Find the cumulative size of the files.
-        size = 0
-        for elem in collect:
-            if os.path.isfile(elem):
-                size += os.stat(elem, follow_symlinks=True).st_size
+        # The toc file changed, drop the lines read before.
+        self.__dict__.pop('_toc_lines', None)
 
         self.size = size
         self.file = tocname
@@ -442,7 +517,7 @@ class Data(models.Model):
         return cond
 
     def get_files(self):
-        fnames = [line.strip() for line in open(self.get_path(), 'rt')]
+        fnames = [line.strip() for line in self._toc_lines]
         return fnames if len(fnames) else [""]
 
     def get_url(self, path=""):
@@ -530,16 +605,49 @@ class Analysis(models.Model):
 
     objects = Manager()
 
+    # Project counts this instance is part of, kept up to date by the signals.
+    _counted = None
+
+    # The json_text last parsed and its parsed value.
+    _parsed_json = (None, None)
+
+    class Meta:
+        indexes = [
+            # Finds the projects of the clones of a root recipe.
+            models.Index(fields=['root', 'project']),
+            # Counts and lists the recipes of a project.
+            models.Index(fields=['project', 'deleted']),
+        ]
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The project counts this row is part of in the database.
+        instance._counted = counted_project(instance)
+        return instance
+
+    def parse_json(self):
+        """
+        Returns a copy of the parsed json_text, parsing only when the json_text changes.
+        """
+        text, parsed = self._parsed_json
+        if text != self.json_text:
+            parsed = hjson.loads(self.json_text)
+            self._parsed_json = (self.json_text, parsed)
+
+        # Callers may modify the data.
+        return copy.deepcopy(parsed)
+
     @property
     def json_data(self):
         """
         Returns the json_text as parsed json_data
         """
         try:
-            json_data = hjson.loads(self.json_text)
+            json_data = self.parse_json()
         except Exception as exc:
             logger.error(f"{exc}. json_text={self.json_text}")
             json_data = {}
@@ -581,7 +689,6 @@ class Analysis(models.Model):
         # Ensure Unix line endings.
         self.template = self.template.replace('\r\n', '\n') if self.template else ""
 
-        self.project.set_counts(save=True)
         super(Analysis, self).save(*args, **kwargs)
 
     @property
@@ -641,11 +748,12 @@ class Analysis(models.Model):
                         lastedit_user=self.lastedit_user,
                         text=self.text,
                         html=self.html,
-                        image=self.image)
+                        image=self.image.name or "")
 
         # Update last edit user and date for children projects.
-        Project.objects.filter(analysis__root=self).update(lastedit_date=self.lastedit_date,
-                                                           lastedit_user=self.lastedit_user)
+        projects = children.values('project_id')
+        Project.objects.filter(id__in=projects).update(lastedit_date=self.lastedit_date,
+                                                       lastedit_user=self.lastedit_user)
 
     def url(self):
         assert self.uid, "Sanity check. UID should always be set."
@@ -738,6 +846,22 @@ class Job(models.Model):
 
     objects = Manager()
 
+    # Project counts this instance is part of, kept up to date by the signals.
+    _counted = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The project counts this row is part of in the database.
+        instance._counted = counted_project(instance)
+        return instance
+
+    class Meta:
+        indexes = [
+            # Counts and lists the results of a project.
+            models.Index(fields=['project', 'deleted']),
+        ]
+
     def is_running(self):
         return self.state == Job.RUNNING
 
@@ -791,7 +915,7 @@ class Job(models.Model):
     def json_data(self):
         "Returns the json_text as parsed json_data"
         try:
-            data_dict = hjson.loads(self.json_text)
+            data_dict = util.load_json_text(self.json_text)
         except Exception as exc:
             logger.error(f"{exc}; text={self.json_text}")
             data_dict = {}
@@ -802,15 +926,13 @@ class Job(models.Model):
         if not (self.start_date and self.end_date):
             value = ''
         else:
-            seconds = int((self.end_date - self.start_date).seconds)
-            if seconds < 60:
-                value = f'{seconds} seconds'
-            elif seconds < 3600:
-                minutes = int(seconds / 60)
-                value = f'{minutes} minutes'
-            else:
-                hours = round(seconds / 3600, 1)
-                value = f'{hours} hours'
+            # The days are part of the total seconds.
+            seconds = (self.end_date - self.start_date).total_seconds()
+            for limit, unit, size in ((60, 'seconds', 1), (3600, 'minutes', 60), (float('inf'), 'hours', 3600)):
+                if seconds < limit:
+                    break
+            amount = round(seconds / size, 1) if unit == 'hours' else int(seconds / size)
+            value = f'{amount} {unit}'
 
         return value
 
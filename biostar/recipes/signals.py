@@ -4,9 +4,10 @@ import logging
 import mistune
 import toml
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from biostar.recipes.models import Project, Access, Analysis, Job, Data
+from biostar.recipes.models import Project, Access, Analysis, Job, Data, counted_project
 from biostar.recipes import util, auth
 
 logger = logging.getLogger("engine")
@@ -22,11 +23,31 @@ def join(*args):
 
 @receiver(post_save, sender=Project)
 def update_access(sender, instance, created, raw, update_fields, **kwargs):
-    # Give the owner WRITE ACCESS if they do not have it.
-    entry = Access.objects.filter(user=instance.owner, project=instance, access=Access.WRITE_ACCESS)
+    # Give the owner WRITE ACCESS if they do not have it, in a single query.
+    entry = Access(user=instance.owner, project=instance, access=Access.WRITE_ACCESS)
+    Access.objects.bulk_create([entry], ignore_conflicts=True)
 
-    if entry.first() is None:
-        entry = Access.objects.create(user=instance.owner, project=instance, access=Access.WRITE_ACCESS)
+
+def change_count(project_id, field, delta):
+    """
+    Increments a count field of a project in the database.
+    """
+    if project_id:
+        Project.objects.filter(id=project_id).update(**{field: F(field) + delta})
+
+
+def update_counts(instance, field, created):
+    """
+    Moves the instance between project counts when its project or deleted state changes.
+    """
+    previous = None if created else instance._counted
+    current = counted_project(instance)
+
+    if previous != current:
+        change_count(project_id=previous, field=field, delta=-1)
+        change_count(project_id=current, field=field, delta=1)
+
+    instance._counted = current
 
 
 def strip_json(json_text):
@@ -112,6 +133,8 @@ def finalize_project(sender, instance, created, raw, update_fields, **kwargs):
         Analysis.objects.filter(project__id=instance.pk).update(deleted=True)
         Data.objects.filter(project__id=instance.pk).update(deleted=True)
         Job.objects.filter(project__id=instance.pk).update(deleted=True)
+        # Bulk updates bypass the signals, recount the project.
+        instance.set_counts()
 
 
 @receiver(post_save, sender=Analysis)
@@ -141,15 +164,22 @@ def finalize_recipe(sender, instance, created, raw, update_fields, **kwargs):
     if instance.is_root:
         instance.update_children()
 
-    # Update the project count and last edit date when job is created
-    instance.project.set_counts()
+    # Update the project count.
+    update_counts(instance=instance, field="recipes_count", created=created)
 
 
 @receiver(post_save, sender=Job)
 def finalize_job(sender, instance, created, raw, update_fields, **kwargs):
 
-    # Update the project count.
-    instance.project.set_counts()
+    if created and counted_project(instance):
+        # Count the new job and update the project last edit in a single query.
+        Project.objects.filter(id=instance.project_id).update(jobs_count=F("jobs_count") + 1,
+                                                              lastedit_user=instance.lastedit_user,
+                                                              lastedit_date=instance.lastedit_date)
+        instance._counted = instance.project_id
+    else:
+        # Update the project count.
+        update_counts(instance=instance, field="jobs_count", created=created)
 
     if created:
         # Generate friendly uid
@@ -173,7 +203,7 @@ def finalize_data(sender, instance, created, raw, update_fields, **kwargs):
     Project.objects.filter(id=instance.project.id).update(lastedit_user=instance.lastedit_user,
                                                           lastedit_date=instance.lastedit_date)
     # Update the project count.
-    instance.project.set_counts()
+    update_counts(instance=instance, field="data_count", created=created)
 
     if created:
         # Generate friendly uid
@@ -189,12 +219,22 @@ def finalize_data(sender, instance, created, raw, update_fields, **kwargs):
         # Build the data directory.
         os.makedirs(instance.dir, exist_ok=True)
 
-        # Set the table of contents for the data
-        if not os.path.isfile(instance.toc):
-            with open(instance.toc, 'wt') as fp:
-                pass
-
         # Update the dir, toc, and uid.
         Data.objects.filter(id=instance.id).update(uid=instance.uid, dir=instance.dir, toc=instance.toc)
 
     instance.make_toc()
+
+
+@receiver(post_delete, sender=Analysis)
+def delete_recipe(sender, instance, **kwargs):
+    change_count(project_id=instance._counted, field="recipes_count", delta=-1)
+
+
+@receiver(post_delete, sender=Job)
+def delete_job(sender, instance, **kwargs):
+    change_count(project_id=instance._counted, field="jobs_count", delta=-1)
+
+
+@receiver(post_delete, sender=Data)
+def delete_data(sender, instance, **kwargs):
+    change_count(project_id=instance._counted, field="data_count", delta=-1)
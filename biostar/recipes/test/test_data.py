@@ -128,6 +128,29 @@ class DataViewTest(TestCase):
 
         self.process_response(response=response, data={})
 
+    def test_data_counts(self):
+        "Test the project data count follows the data"
+
+        def data_count():
+            return models.Project.objects.get(id=self.project.id).data_count
+
+        self.assertEqual(data_count(), 1, "Data count not incremented on create")
+
+        data = models.Data.objects.get(id=self.data.id)
+        data.deleted = True
+        data.save()
+        self.assertEqual(data_count(), 0, "Data count not decremented on delete")
+
+        # Saving again does not change the count.
+        data.save()
+        self.assertEqual(data_count(), 0, "Data count changed without a state change")
+
+        data.deleted = False
+        data.save()
+        self.assertEqual(data_count(), 1, "Data count not incremented on restore")
+
+        data.delete()
+        self.assertEqual(data_count(), 0, "Data count not decremented on removal")
 
     def test_data_serve(self):
         "Test data file serving"
@@ -148,3 +148,25 @@ class UtilTests(TestCase):
             with self.assertRaises(ValidationError):
                 forms.check_size(File(open(fname, "r")), maxsize=0.000001)
 
+    def test_findsizes(self):
+        "Test file sizes are collected with the file list"
+
+        location = "biostar/recipes/test/data"
+        collect = engine_util.findfiles(location, collect=[])
+        sizes = dict(engine_util.findsizes(location))
+
+        self.assertEqual(sorted(sizes), sorted(collect), "File lists do not match")
+
+        for fname in collect:
+            self.assertEqual(sizes[fname], os.path.getsize(fname), f"Size mismatch for {fname}")
+
+    def test_json_text(self):
+        "Test job data round trips through JSON and legacy TOML still loads"
+
+        data = {"foo": {"value": 1, "label": None}, "bar": {"value": "text"}}
+        text = engine_util.dump_json_text(data)
+
+        self.assertEqual(engine_util.load_json_text(text), {"foo": {"value": 1}, "bar": {"value": "text"}})
+
+        legacy = 'foo = { value = 1 }'
+        self.assertEqual(engine_util.load_json_text(legacy), {"foo": {"value": 1}})
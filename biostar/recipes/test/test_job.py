@@ -1,4 +1,5 @@
 import logging,os
+from datetime import timedelta
 from django.test import TestCase, override_settings
 from unittest.mock import patch, MagicMock
 from django.core import management
@@ -77,6 +78,32 @@ class JobViewTest(TestCase):
 
         self.process_response(response=response, data={})
 
+    def test_job_counts(self):
+        "Test job creation updates the project"
+
+        job = auth.create_job(analysis=self.recipe, user=self.owner)
+        project = models.Project.objects.get(id=self.project.id)
+
+        self.assertEqual(project.jobs_count, 2, "Job count not incremented on create")
+        self.assertEqual(project.lastedit_user, job.lastedit_user, "Project last edit user not updated")
+
+        # Saving the project loaded before the job keeps the count.
+        self.project.save()
+        project = models.Project.objects.get(id=self.project.id)
+        self.assertEqual(project.jobs_count, 2, "Job count overwritten on project save")
+
+    def test_job_elapsed(self):
+        "Test the elapsed time of a job"
+
+        job = self.job
+        job.start_date = job.date
+        self.assertEqual(job.elapsed(), '', "Elapsed time without an end date")
+
+        for delta, value in ((timedelta(seconds=30), '30 seconds'), (timedelta(minutes=5), '5 minutes'),
+                             (timedelta(hours=2, minutes=30), '2.5 hours'), (timedelta(days=1, hours=3), '27.0 hours')):
+            job.end_date = job.start_date + delta
+            self.assertEqual(job.elapsed(), value, "Incorrect elapsed time")
+
     def test_job_rerun(self):
         "Test Job rerun"
         url = reverse('job_delete', kwargs=dict(uid=self.job.uid))
@@ -3,6 +3,7 @@ import os
 from unittest.mock import patch, MagicMock
 
 from django.test import TestCase, override_settings
+from django.core import management
 from django.urls import reverse
 from  django.conf import settings
 from biostar.recipes import auth
@@ -130,6 +131,79 @@ class ProjectViewTest(TestCase):
 
         self.assertEqual(changed.uid, self.project.uid)
 
+    def test_project_html(self):
+        "Test the html follows the project text"
+
+        project = models.Project.objects.get(id=self.project.id)
+        project.text = "**tested**"
+        project.save()
+
+        project = models.Project.objects.get(id=self.project.id)
+        self.assertIn("<strong>tested</strong>", project.html, "Html not rendered after the text changed")
+
+    def test_project_counts(self):
+        "Test saving a stale project keeps the counts"
+
+        project = models.Project.objects.get(id=self.project.id)
+
+        auth.create_data(project=self.project, path=__file__, name="tested")
+        auth.create_analysis(project=self.project, json_text="", template="")
+
+        # The instance was loaded before the data and recipe were added.
+        project.save()
+
+        project = models.Project.objects.get(id=self.project.id)
+        self.assertEqual(project.data_count, project.data_set.filter(deleted=False).count(),
+                         "Data count overwritten on save")
+        self.assertEqual(project.recipes_count, project.analysis_set.filter(deleted=False).count(),
+                         "Recipe count overwritten on save")
+
+    def test_project_recount(self):
+        "Test the recount command repairs the counts"
+
+        auth.create_data(project=self.project, path=__file__, name="tested")
+        recipe = auth.create_analysis(project=self.project, json_text="", template="",
+                                      security=models.Analysis.AUTHORIZED)
+        auth.create_job(analysis=recipe, user=self.owner)
+
+        models.Project.objects.filter(id=self.project.id).update(data_count=10, jobs_count=10)
+
+        management.call_command('recount')
+
+        project = models.Project.objects.get(id=self.project.id)
+        self.assertEqual(project.data_count, project.data_set.filter(deleted=False).count(),
+                         "Data count not recounted")
+        self.assertEqual(project.jobs_count, project.job_set.filter(deleted=False).count(),
+                         "Job count not recounted")
+
+    def test_project_owner(self):
+        "Test a new project owner gets write access"
+
+        user = models.User.objects.create_user(username=f"tested{get_uuid(10)}", email="owner@l.com")
+
+        project = models.Project.objects.get(id=self.project.id)
+        project.owner = user
+        project.save()
+
+        self.assertTrue(models.Access.objects.filter(user=user, project=project,
+                                                     access=models.Access.WRITE_ACCESS).exists(),
+                        "New owner not given write access")
+        self.assertTrue(auth.is_readable(user=user, obj=project), "New owner can not read the project")
+
+    def test_project_owner_restore(self):
+        "Test setting the current owner again restores the write access"
+
+        models.Access.objects.filter(user=self.owner, project=self.project).delete()
+
+        project = models.Project.objects.get(id=self.project.id)
+        project.owner = self.owner
+        project.save()
+
+        self.assertTrue(models.Access.objects.filter(user=self.owner, project=project,
+                                                     access=models.Access.WRITE_ACCESS).exists(),
+                        "Owner write access not restored")
+        self.assertTrue(auth.is_readable(user=self.owner, obj=project), "Owner can not read the project")
+
     def process_response(self, response, data, save=False):
         "Check the response on POST request is redirected"
 
@@ -168,6 +168,45 @@ class RecipeViewTest(TestCase):
 
         self.assertEqual(changed.uid, self.recipe.uid)
 
+    def test_recipe_update_html(self):
+        "Test the html follows text changed through an update"
+
+        auth.create_analysis(project=self.project, uid=self.recipe.uid, text="**tested**", update=True)
+
+        recipe = models.Analysis.objects.get(id=self.recipe.id)
+        recipe.save()
+
+        recipe = models.Analysis.objects.get(id=self.recipe.id)
+        self.assertIn("<strong>tested</strong>", recipe.html, "Html not rendered after the text was updated")
+
+    def test_recipe_clone_update(self):
+        "Test changes to a root recipe reach its clones"
+
+        project = auth.create_project(user=self.owner, name="cloned")
+        clone = auth.create_analysis(project=project, json_text="", template="# clone", root=self.recipe)
+
+        self.recipe.template = "# changed template"
+        self.recipe.save()
+
+        clone = models.Analysis.objects.get(id=clone.id)
+        project = models.Project.objects.get(id=project.id)
+
+        self.assertEqual(clone.template, "# changed template", "Clone template not updated")
+        self.assertEqual(project.lastedit_date, self.recipe.lastedit_date, "Clone project not updated")
+
+    def test_recipe_json_data(self):
+        "Test the json data follows the json text"
+
+        self.recipe.json_text = 'foo = { value = 1 }'
+        self.assertEqual(self.recipe.json_data['foo']['value'], 1)
+
+        # Changes to the returned data do not leak into the next access.
+        self.recipe.json_data['foo']['value'] = 3
+        self.assertEqual(self.recipe.json_data['foo']['value'], 1)
+
+        self.recipe.json_text = 'foo = { value = 2 }'
+        self.assertEqual(self.recipe.json_data['foo']['value'], 2, "Json data not parsed after the text changed")
+
     def process_response(self, response, data, model=models.Analysis, save=False):
         "Check the response on POST request is redirected"
 
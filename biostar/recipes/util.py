@@ -1,5 +1,6 @@
 import gzip
 import io
+import json
 import mimetypes
 import os
 import quopri
@@ -47,6 +48,34 @@ def pp(json):
     return text
 
 
+def drop_none(data):
+    """
+    Removes the None values from nested dictionaries, toml does not store them either.
+    """
+    if isinstance(data, dict):
+        return {key: drop_none(value) for key, value in data.items() if value is not None}
+    if isinstance(data, (list, tuple)):
+        return [drop_none(value) for value in data]
+    return data
+
+
+def dump_json_text(data):
+    """
+    Serializes job data to compact JSON.
+    """
+    return json.dumps(drop_none(data), separators=(',', ':'), default=str)
+
+
+def load_json_text(text):
+    """
+    Parses job data stored as JSON, older jobs are stored as TOML.
+    """
+    # A TOML document never starts with a curly brace.
+    if text.lstrip().startswith("{"):
+        return json.loads(text)
+    return hjson.loads(text)
+
+
 def toml_error(exp_msg, text):
 
     # Parse the last part with the line number
@@ -147,12 +176,19 @@ def findfiles(location, collect):
     """
     Returns a list of all files in a directory.
     """
+    collect.extend(path for path, size in findsizes(location))
+    return collect
 
-    for item in os.scandir(location):
 
-        if item.is_dir():
-            findfiles(item.path, collect=collect)
-        else:
-            collect.append(os.path.abspath(item.path))
-
-    return collect
+def findsizes(location):
+    """
+    Yields the path and size of all files in a directory.
+    """
+    with os.scandir(location) as items:
+        for item in items:
+            if item.is_dir():
+                yield from findsizes(item.path)
+            else:
+                # The entry caches the stat result, broken links have no size.
+                size = item.stat().st_size if item.is_file() else 0
+                yield os.path.abspath(item.path), size